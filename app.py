@@ -1,7 +1,274 @@
 import streamlit as st
+import base64
+import html
+import itertools
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from llm_utils import set_api_key, set_model, AVAILABLE_MODELS
 
+# Light background for the mermaid diagram iframes (minified)
+_MERMAID_CSS = (
+    '<style>iframe[title="streamlit_mermaid.st_mermaid"]'
+    '{background-color:#f8f9fa!important;border-radius:10px;padding:10px}</style>'
+)
+
+# Number of most recent chat messages rendered on a full run
+_HISTORY_WINDOW = 50
+
+# Messages the chat fragment redraws on its own before asking for a full
+# run, which moves the already-rendered mark forward
+_FRAGMENT_BACKLOG = 20
+
+# Blinking caret drawn by CSS after a reply that is still streaming
+_CARET_CSS = (
+    '<style>@keyframes caret-blink{50%{opacity:0}}'
+    '.streaming-caret{white-space:pre-wrap}'
+    '.streaming-caret::after{content:"▌";animation:caret-blink 1s steps(1) infinite}</style>'
+)
+
+
+def _throttled_render(placeholder, gen, min_interval=0.05, min_chars=8):
+    """
+    Render a streamed response into placeholder, re-rendering at most every
+    min_interval seconds and only once min_chars new characters have arrived.
+    While streaming the text is shown escaped and unparsed, so markdown is
+    parsed once on the final render. The caret comes from _CARET_CSS.
+    Returns the full response.
+    """
+    parts = []
+    length = 0
+    last_flush = 0.0
+    last_len = 0
+    for chunk in gen:
+        parts.append(chunk)
+        length += len(chunk)
+        now = time.monotonic()
+        if now - last_flush >= min_interval and length - last_len >= min_chars:
+            # Join only when flushing; keep the joined text as the single part
+            parts[:] = ["".join(parts)]
+            # Encoded newlines keep the text a single HTML block
+            text = html.escape(parts[0]).replace("\n", "&#10;")
+            placeholder.markdown(f'<div class="streaming-caret">{text}</div>', unsafe_allow_html=True)
+            last_flush = now
+            last_len = length
+    buffer = "".join(parts)
+    placeholder.markdown(buffer)
+    return buffer
+
+
+@st.cache_resource
+def _executor():
+    """Worker pool that runs LLM calls off the script thread."""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def _submit(fn, *args):
+    """Run fn(*args) on the worker pool with this script run's context attached."""
+    ctx = get_script_run_ctx()
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    return _executor().submit(run)
+
+
+def _in_background(gen):
+    """
+    Drive the generator gen on its own worker thread and yield its chunks on
+    the calling thread, so the script is free to render while the LLM blocks.
+    A reply holds its thread for as long as it streams, so each reply gets a
+    dedicated thread rather than a slot in the shared pool. If the caller
+    stops reading (the run was interrupted), the worker is told to stop
+    after its current chunk, closing gen so it makes no further changes to
+    the session's state; the script doesn't wait for it. An error from an
+    interrupted reply is shown by the next chat run (see _chat_panel).
+    """
+    chunks = queue.Queue()
+    stop = threading.Event()
+    lock = threading.Lock()  # orders an error against the stop request
+    done = object()
+    errors = []
+
+    def pump():
+        try:
+            for chunk in gen:
+                if stop.is_set():
+                    break
+                chunks.put(chunk)
+        except Exception as e:
+            with lock:
+                if stop.is_set():
+                    st.session_state["_reply_error"] = e
+                else:
+                    errors.append(e)
+        finally:
+            gen.close()
+            chunks.put(done)
+
+    # The orchestrator reads and writes st.session_state, hence the context
+    worker = threading.Thread(target=pump, daemon=True)
+    add_script_run_ctx(worker, get_script_run_ctx())
+    worker.start()
+    interrupted = True
+    try:
+        while (chunk := chunks.get()) is not done:
+            yield chunk
+        interrupted = False
+    finally:
+        with lock:
+            stop.set()
+        if interrupted and errors:
+            st.session_state["_reply_error"] = errors[0]
+    if errors:
+        raise errors[0]  # re-raise any error from the worker
+
+
+def _truncate(text, limit=60):
+    """Shorten text to limit characters for sidebar display."""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+@st.cache_data(show_spinner=False)
+def _progress(collected):
+    """Sidebar (answered, total) question counts, cached per collected data."""
+    from attribute_schema import get_progress
+    return get_progress(dict(collected))
+
+
+@st.cache_data(show_spinner=False)
+def _gap_analysis(collected):
+    """
+    GAP analysis result, its summary and the color-coded SAP diagram,
+    cached per collected data.
+    """
+    from gap_analysis import analyze_gaps, generate_gap_summary
+    from sap_gap_diagram import generate_sap_gap_diagram
+    gap_result = analyze_gaps(collected)
+    return gap_result, generate_gap_summary(gap_result), generate_sap_gap_diagram(collected, gap_result)
+
+
+@st.cache_data(show_spinner=False)
+def _toc_analysis(collected):
+    """
+    ToC analysis result, its CRT diagram and summary, cached per collected
+    data so the LLM analysis runs once per distinct set of answers.
+    """
+    from toc_analysis import analyze_toc, generate_crt_diagram, generate_toc_summary
+    toc_result = analyze_toc(collected)
+    return toc_result, generate_crt_diagram(toc_result), generate_toc_summary(toc_result)
+
+
+@st.cache_resource
+def _diagram_deps():
+    """Modules used by the diagram view, imported once per process."""
+    import streamlit_mermaid as stmd
+    return SimpleNamespace(stmd=stmd)
+
+
+@st.cache_resource
+def _get_orchestrator():
+    """Process-wide Orchestrator; it holds no per-session state."""
+    from orchestrator import Orchestrator
+    return Orchestrator()
+
+
+@st.cache_resource
+def _get_order_manager():
+    """Process-wide OrderManager used to open new conversations."""
+    from order_mgmt import OrderManager
+    return OrderManager()
+
+
+def _sidebar_progress():
+    """Progress bar, current question and captured data for the sidebar."""
+    order_state = st.session_state.get("order_state")
+    if order_state is None:
+        st.info("Start the conversation to begin process discovery.")
+        return
+    collected = order_state.collected_data
+
+    # Progress bar using new hierarchical schema
+    answered, total = _progress(collected)
+    progress = answered / total if total > 0 else 0
+
+    # Caption rides on the progress element rather than a separate one
+    st.progress(progress, text=f"**{answered}/{total}** questions answered")
+
+    # Current question
+    current_q_id = order_state.current_question_id
+    if current_q_id:
+        st.markdown(f"### 🎯 Current Question\n**Q{current_q_id}**")
+
+    # Captured data (collapsible)
+    if collected:
+        with st.expander("✅ Captured Data", expanded=False):
+            # One markdown element for all items rather than one per item
+            st.markdown("\n\n".join(
+                f"**{attr}:** {_truncate(str(value))}" for attr, value in collected.items()
+            ))
+
+
+@st.fragment
+def _chat_panel(orchestrator, progress_slot):
+    """
+    Chat input and the streamed reply. Runs as a fragment so that submitting
+    a message reruns only this panel; the sidebar progress is redrawn in
+    place through progress_slot.
+    """
+    # A reply that was interrupted failed after its run had moved on
+    if (reply_error := st.session_state.pop("_reply_error", None)) is not None:
+        st.exception(reply_error)
+
+    # Earlier history stays on the page from the last full run; only redraw
+    # messages added by fragment reruns since then
+    for message in st.session_state.messages[st.session_state["_rendered_up_to"]:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+    # Accept user input (kept pinned to the bottom of the page)
+    with st.bottom:
+        prompt = st.chat_input("Describe your order process...")
+
+    if prompt:
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        
+        # Display user message
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Display assistant response, streamed from the Orchestrator
+        with st.chat_message("assistant"):
+            stream = _in_background(orchestrator.handle_message_stream(prompt, st.session_state))
+            with st.spinner("Thinking..."):
+                first_chunk = next(stream, "")
+            try:
+                full_response = _throttled_render(st.empty(), itertools.chain([first_chunk], stream))
+            finally:
+                stream.close()  # stop the worker now if the run was interrupted
+            
+        # Add assistant response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+        
+        with progress_slot.container():
+            _sidebar_progress()
+
+        # Collected data only changes here, so the sidebar reads this flag.
+        # Fragments can't add widgets to the sidebar, so a full rerun is
+        # needed when the diagram button first appears, and periodically
+        # so each fragment rerun keeps redrawing only a bounded backlog.
+        show_button = len(st.session_state["order_state"].collected_data) >= 3
+        backlog = len(st.session_state.messages) - st.session_state["_rendered_up_to"]
+        if show_button != st.session_state.get("_show_diagram_button", False) or backlog >= _FRAGMENT_BACKLOG:
+            st.session_state["_show_diagram_button"] = show_button
+            st.rerun()
+
+
 # Page config
 st.set_page_config(page_title="O2C Process Discovery", page_icon="📋", layout="wide")
 
@@ -35,38 +302,16 @@ with st.sidebar:
     st.divider()
     st.header("📊 Process Discovery Progress")
     
-    if "order_state" in st.session_state:
-        order_state = st.session_state["order_state"]
-        collected = order_state.get("collected_data", {})
-        
-        # Progress bar using new hierarchical schema
-        from attribute_schema import get_progress, get_next_question_info
-        answered, total = get_progress(collected)
-        progress = answered / total if total > 0 else 0
-        
-        st.progress(progress)
-        st.caption(f"**{answered}/{total}** questions answered")
-        
-        # Current question
-        current_q_id = order_state.get("current_question_id")
-        if current_q_id:
-            st.subheader("🎯 Current Question")
-            st.write(f"**Q{current_q_id}**")
-        
-        # Captured data (collapsible)
-        if collected:
-            with st.expander("✅ Captured Data", expanded=False):
-                for attr, value in collected.items():
-                    display_val = str(value)[:60] + "..." if len(str(value)) > 60 else str(value)
-                    st.write(f"**{attr}:** {display_val}")
-        
-        # View Process Diagram button
-        if len(collected) >= 3:
-            st.divider()
-            if st.button("📊 View Process Diagram", use_container_width=True):
-                st.session_state["show_diagram"] = True
-    else:
-        st.info("Start the conversation to begin process discovery.")
+    # The chat fragment redraws this slot after each reply
+    progress_slot = st.empty()
+    with progress_slot.container():
+        _sidebar_progress()
+    
+    # View Process Diagram button
+    if st.session_state.get("_show_diagram_button"):
+        st.divider()
+        if st.button("📊 View Process Diagram", use_container_width=True):
+            st.session_state["show_diagram"] = True
 
 # Main content
 st.title("📋 Order-to-Cash Process Discovery")
@@ -74,173 +319,131 @@ st.markdown("I'm a consultant here to understand your end-to-end Order-to-Cash p
 
 # Show Process Diagram if requested
 if st.session_state.get("show_diagram", False):
-    from sap_gap_diagram import generate_sap_gap_diagram, get_legend
-    from gap_analysis import analyze_gaps, generate_gap_summary
-    from toc_analysis import analyze_toc, generate_crt_diagram, generate_toc_summary
-    import streamlit_mermaid as stmd
+    deps = _diagram_deps()
     
-    collected = st.session_state.get("order_state", {}).get("collected_data", {})
+    # Light background for the diagram containers, emitted once per run
+    st.markdown(_MERMAID_CSS, unsafe_allow_html=True)
     
-    # Create a cache key from collected data
-    cache_key = str(sorted(collected.items())) if collected else "empty"
-    
-    # Cache analysis results in session state to avoid re-running on each render
-    if "analysis_cache" not in st.session_state or st.session_state.get("analysis_cache_key") != cache_key:
-        with st.spinner("🔄 Running analysis... This may take a moment."):
-            # Run GAP analysis
-            gap_result = analyze_gaps(collected)
-            gap_summary = generate_gap_summary(gap_result)
-            
-            # Generate color-coded SAP diagram based on gaps
-            sap_gap_diagram = generate_sap_gap_diagram(collected, gap_result)
-            
-            # Run ToC analysis
-            toc_result = analyze_toc(collected)
-            crt_diagram = generate_crt_diagram(toc_result)
-            toc_summary = generate_toc_summary(toc_result)
-            
-            # Cache results
-            st.session_state["analysis_cache"] = {
-                "gap_result": gap_result,
-                "gap_summary": gap_summary,
-                "sap_gap_diagram": sap_gap_diagram,
-                "toc_result": toc_result,
-                "crt_diagram": crt_diagram,
-                "toc_summary": toc_summary
-            }
-            st.session_state["analysis_cache_key"] = cache_key
-            
-            # Force rerun to render with cached data
-            st.rerun()
+    order_state = st.session_state.get("order_state")
+    collected = order_state.collected_data if order_state else {}
     
-    # Use cached results
-    cache = st.session_state["analysis_cache"]
-    gap_result = cache["gap_result"]
-    gap_summary = cache["gap_summary"]
-    sap_gap_diagram = cache["sap_gap_diagram"]
-    toc_result = cache["toc_result"]
-    crt_diagram = cache["crt_diagram"]
-    toc_summary = cache["toc_summary"]
+    # Run GAP analysis and color-coded SAP diagram (rule-based, cached)
+    gap_result, gap_summary, sap_gap_diagram = _gap_analysis(collected)
     
-    # Create tabs
-    tab1, tab2, tab3 = st.tabs(["📊 Process GAP View", "📝 GAP Summary", "🔗 ToC Analysis"])
+    # Create tabs; tracking the selected tab lets only that tab render
+    tab1, tab2, tab3 = st.tabs(
+        ["📊 Process GAP View", "📝 GAP Summary", "🔗 ToC Analysis"],
+        key="diagram_tab",
+        on_change="rerun",
+    )
     
-    with tab1:
-        st.subheader("SAP Standard Process - Color-Coded by As-Is GAPs")
-        
-        # Show score and legend
-        score = gap_result.get("score", 0)
-        captured = gap_result.get("captured_count", 0)
-        total_req = gap_result.get("total_required", 16)
+    if tab1.open:
+        with tab1:
+            st.subheader("SAP Standard Process - Color-Coded by As-Is GAPs")
         
-        col1, col2 = st.columns([1, 2])
-        with col1:
-            if score >= 80:
-                st.success(f"🟢 Alignment: {score}%")
-            elif score >= 50:
-                st.warning(f"🟡 Alignment: {score}%")
-            else:
-                st.error(f"🔴 Alignment: {score}%")
-        with col2:
-            st.caption(f"**{captured}/{total_req}** process areas captured")
+            # Show score and legend
+            score = gap_result.get("score", 0)
+            captured = gap_result.get("captured_count", 0)
+            total_req = gap_result.get("total_required", 16)
         
-        # Legend inline
-        st.markdown("**Legend:** 🟢 Aligned | 🔴 Gap | ⚫ Not Captured")
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                if score >= 80:
+                    st.success(f"🟢 Alignment: {score}%")
+                elif score >= 50:
+                    st.warning(f"🟡 Alignment: {score}%")
+                else:
+                    st.error(f"🔴 Alignment: {score}%")
+            with col2:
+                st.caption(f"**{captured}/{total_req}** process areas captured")
         
-        # Add CSS for light background diagram container
-        st.markdown("""
-        <style>
-            iframe[title="streamlit_mermaid.st_mermaid"] {
-                background-color: #f8f9fa !important;
-                border-radius: 10px;
-                padding: 10px;
-            }
-        </style>
-        """, unsafe_allow_html=True)
+            # Legend inline
+            st.markdown("**Legend:** 🟢 Aligned | 🔴 Gap | ⚫ Not Captured")
         
-        # The color-coded SAP diagram
-        stmd.st_mermaid(sap_gap_diagram, height=600)
+            # The color-coded SAP diagram
+            deps.stmd.st_mermaid(sap_gap_diagram, height=600)
     
-    with tab2:
-        st.subheader("📝 GAP Analysis Summary")
+    if tab2.open:
+        with tab2:
+            st.subheader("📝 GAP Analysis Summary")
         
-        # Score display
-        score = gap_result.get("score", 0)
-        captured = gap_result.get("captured_count", 0)
-        total_req = gap_result.get("total_required", 16)
+            # Score display
+            score = gap_result.get("score", 0)
+            captured = gap_result.get("captured_count", 0)
+            total_req = gap_result.get("total_required", 16)
         
-        st.caption(f"**{captured}/{total_req}** process areas captured")
+            st.caption(f"**{captured}/{total_req}** process areas captured")
         
-        if score >= 80:
-            st.success(f"🟢 Alignment Score: {score}%")
-        elif score >= 50:
-            st.warning(f"🟡 Alignment Score: {score}%")
-        else:
-            st.error(f"🔴 Alignment Score: {score}%")
+            if score >= 80:
+                st.success(f"🟢 Alignment Score: {score}%")
+            elif score >= 50:
+                st.warning(f"🟡 Alignment Score: {score}%")
+            else:
+                st.error(f"🔴 Alignment Score: {score}%")
         
-        st.divider()
+            st.divider()
         
-        # GAP Summary
-        st.markdown(gap_summary)
+            # GAP Summary
+            st.markdown(gap_summary)
     
-    with tab3:
-        st.subheader("🔗 Theory of Constraints - Current Reality Tree")
+    if tab3.open:
+        # The ToC analysis (an LLM call) runs on a worker, submitted the
+        # first time the tab opens. Tab switches rerun the script, so it is
+        # submitted once per set of answers (retried if it failed), not once
+        # per run.
+        toc_key = repr(sorted(collected.items()))
+        submitted_key, toc_future = st.session_state.get("_toc_future", (None, None))
+        if submitted_key != toc_key or (toc_future.done() and toc_future.exception()):
+            toc_future = _submit(_toc_analysis, collected)
+            st.session_state["_toc_future"] = (toc_key, toc_future)
         
-        st.markdown("""
-        The **Current Reality Tree (CRT)** is a Theory of Constraints tool that identifies the 
-        **core problems** in your process by linking visible symptoms (Undesirable Effects) 
-        to their underlying root causes.
-        """)
+        with tab3:
+            with st.spinner("🔄 Running analysis... This may take a moment."):
+                toc_result, crt_diagram, toc_summary = toc_future.result()
+            
+            st.subheader("🔗 Theory of Constraints - Current Reality Tree")
         
-        # Legend
-        st.markdown("""
-        **Legend:** 🔴 UDE (Undesirable Effect) | 🔵 Root Cause | ⚪ Intermediate Effect
-        """)
+            st.markdown("""
+            The **Current Reality Tree (CRT)** is a Theory of Constraints tool that identifies the 
+            **core problems** in your process by linking visible symptoms (Undesirable Effects) 
+            to their underlying root causes.
+            """)
         
-        # Add CSS for light background diagram container
-        st.markdown("""
-        <style>
-            iframe[title="streamlit_mermaid.st_mermaid"] {
-                background-color: #f8f9fa !important;
-                border-radius: 10px;
-                padding: 10px;
-            }
-        </style>
-        """, unsafe_allow_html=True)
+            # Legend
+            st.markdown("""
+            **Legend:** 🔴 UDE (Undesirable Effect) | 🔵 Root Cause | ⚪ Intermediate Effect
+            """)
         
-        # The CRT diagram
-        if crt_diagram:
-            # Show debug expander with diagram code (useful for troubleshooting)
-            with st.expander("🔧 Debug: View Mermaid Code", expanded=False):
-                st.code(crt_diagram, language="mermaid")
-            
-            # Use mermaid.ink API to render diagram as image (works reliably on cloud)
-            import base64
-            import urllib.parse
+            # The CRT diagram
+            if crt_diagram:
+                # Show debug expander with diagram code (useful for troubleshooting)
+                with st.expander("🔧 Debug: View Mermaid Code", expanded=False):
+                    st.code(crt_diagram, language="mermaid")
             
-            # Encode diagram for mermaid.ink URL
-            diagram_bytes = crt_diagram.encode('utf-8')
-            diagram_base64 = base64.urlsafe_b64encode(diagram_bytes).decode('utf-8')
+                # Use mermaid.ink API to render diagram as image (works reliably on cloud)
+                # Encode diagram for mermaid.ink URL
+                diagram_bytes = crt_diagram.encode('utf-8')
+                diagram_base64 = base64.urlsafe_b64encode(diagram_bytes).decode('utf-8')
             
-            # mermaid.ink renders the diagram as SVG
-            mermaid_url = f"https://mermaid.ink/svg/{diagram_base64}"
+                # mermaid.ink renders the diagram as SVG
+                mermaid_url = f"https://mermaid.ink/svg/{diagram_base64}"
             
-            # Display as image with light background container
-            st.markdown(f'''
-            <div style="background-color: #333333; border-radius: 10px; padding: 20px; text-align: center;">
-                <img src="{mermaid_url}" style="max-width: 100%; height: auto;" alt="Current Reality Tree Diagram"/>
-            </div>
-            ''', unsafe_allow_html=True)
-        else:
-            st.warning("Unable to generate Current Reality Tree. Please complete more of the conversation.")
-            # Debug: Show what toc_result contains
-            with st.expander("Debug: ToC Analysis Result"):
-                st.json(toc_result if toc_result else {"error": "No ToC result"})
+                # Display as image with light background container
+                st.markdown(f'''
+                <div style="background-color: #333333; border-radius: 10px; padding: 20px; text-align: center;">
+                    <img src="{mermaid_url}" style="max-width: 100%; height: auto;" alt="Current Reality Tree Diagram"/>
+                </div>
+                ''', unsafe_allow_html=True)
+            else:
+                st.warning("Unable to generate Current Reality Tree. Please complete more of the conversation.")
+                # Debug: Show what toc_result contains
+                with st.expander("Debug: ToC Analysis Result"):
+                    st.json(toc_result if toc_result else {"error": "No ToC result"})
         
-        st.divider()
+            st.divider()
         
-        # ToC Summary
-        st.markdown(toc_summary)
+            # ToC Summary
+            st.markdown(toc_summary)
     
     st.divider()
     if st.button("🔙 Back to Chat", use_container_width=True):
@@ -249,55 +452,32 @@ if st.session_state.get("show_diagram", False):
 else:
     # Initialize Orchestrator only after API key is set
     if api_key:
-        from orchestrator import Orchestrator
-        
-        if "orchestrator" not in st.session_state:
-            st.session_state.orchestrator = Orchestrator()
+        orchestrator = _get_orchestrator()
 
         # Initialize Chat History with opening message
         if "messages" not in st.session_state:
             st.session_state.messages = []
             # Start the conversation with opening message
-            from order_mgmt import OrderManager
-            mgr = OrderManager()
-            opening, state = mgr.start_conversation()
+            opening, state = _get_order_manager().start_conversation()
             st.session_state.messages.append({"role": "assistant", "content": opening})
             st.session_state["order_state"] = state
             st.session_state["mode"] = "ORDER_MGMT"
 
-        # Display chat messages from history
-        for message in st.session_state.messages:
+        st.markdown(_CARET_CSS, unsafe_allow_html=True)
+
+        # Display chat messages from history, only the latest window unless asked
+        messages = st.session_state.messages
+        start = 0
+        if not st.session_state.get("_show_full_history"):
+            start = max(0, len(messages) - _HISTORY_WINDOW)
+        if start and st.button(f"Show {start} earlier messages"):
+            st.session_state["_show_full_history"] = True
+            st.rerun()
+        for message in messages[start:]:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
+        st.session_state["_rendered_up_to"] = len(st.session_state.messages)
 
-        # Accept user input
-        if prompt := st.chat_input("Describe your order process..."):
-            # Add user message to chat history
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            
-            # Display user message
-            with st.chat_message("user"):
-                st.markdown(prompt)
-
-            # Display assistant response
-            with st.chat_message("assistant"):
-                message_placeholder = st.empty()
-                full_response = ""
-                
-                # Call Orchestrator
-                response = st.session_state.orchestrator.handle_message(prompt, st.session_state)
-                
-                # Simulate typing effect
-                for chunk in response.split():
-                    full_response += chunk + " "
-                    time.sleep(0.02)
-                    message_placeholder.markdown(full_response + "▌")
-                message_placeholder.markdown(full_response)
-                
-            # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
-            
-            # Rerun to update sidebar
-            st.rerun()
+        _chat_panel(orchestrator, progress_slot)
     else:
         st.info("👈 Please enter your Together AI API key in the sidebar to start the conversation.")
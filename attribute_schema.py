@@ -9,6 +9,11 @@ Conditional flow ensures questions are asked in order,
 skipping conditional ones if their trigger condition is not met.
 """
 
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
 # Question flow order - each entry has:
 # - id: Question identifier (matches checklist numbering)
 # - key: Attribute key to store the answer
@@ -180,47 +185,77 @@ QUESTION_FLOW = [
     },
 ]
 
+# Examples are never modified; freeze them so every shared view is read-only
+for q in QUESTION_FLOW:
+    if "examples" in q:
+        q["examples"] = tuple(q["examples"])
+
 # Build attribute schema from flow
 REQUIRED_ATTRIBUTES = {}
 for q in QUESTION_FLOW:
-    REQUIRED_ATTRIBUTES[q["key"]] = {
+    REQUIRED_ATTRIBUTES[q["key"]] = MappingProxyType({
         "id": q["id"],
         "question": q.get("question"),
         "type": q["type"],
         "condition": q.get("condition"),
-        "examples": q.get("examples", []),
+        "examples": q.get("examples", ()),
         "inference_from": q.get("inference_from"),
         "inference_logic": q.get("inference_logic"),
-    }
+    })
+
+# Every attribute key in flow order
+_ALL_ATTRIBUTE_KEYS = tuple(q["key"] for q in QUESTION_FLOW)
+
+# Attribute key for each question id, for direct lookup of the current question
+QUESTION_KEY_BY_ID = {q["id"]: q["key"] for q in QUESTION_FLOW}
+
+# Mandatory questions in flow order as (key, condition), built once
+_MANDATORY = tuple((q["key"], q.get("condition")) for q in QUESTION_FLOW if q["type"] == "M")
+
+# What get_next_question_info returns for each mandatory question, built once.
+# The entries are shared between callers, so they are read-only views.
+_QUESTION_INFO = {
+    q["key"]: MappingProxyType({
+        "id": q["id"],
+        "key": q["key"],
+        "question": q["question"],
+        "examples": q.get("examples", ()),
+    })
+    for q in QUESTION_FLOW if q["type"] == "M"
+}
 
 
 # ============ INFERENCE FUNCTIONS ============
 
+def _keyword_pattern(*keywords):
+    """One case-insensitive regex matching any of the keywords as substrings."""
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+_MANUAL_INTAKE_RE = _keyword_pattern("manual", "email", "pdf", "phone", "fax", "physical", "paper", "mail", "scan")
+_ERP_RE = _keyword_pattern("erp", "sap", "oracle", "netsuite", "dynamics", "jd edwards", "infor", "epicor", "sage")
+_AUTO_APPROVAL_RE = _keyword_pattern("auto", "automatic", "threshold", "under $", "below")
+_MANUAL_CREDIT_RE = _keyword_pattern("manual", "analyst", "review", "approve", "manager", "above", "over $")
+
 def infer_has_manual(channels_value):
     """Infer if manual intake exists from order_origin_channels."""
     if not channels_value:
         return None
-    lower = channels_value.lower()
-    manual_keywords = ["manual", "email", "pdf", "phone", "fax", "physical", "paper", "mail", "scan"]
-    return "Yes" if any(kw in lower for kw in manual_keywords) else "No"
+    return "Yes" if _MANUAL_INTAKE_RE.search(channels_value) else "No"
 
 
 def infer_uses_erp(system_value):
     """Infer if client uses ERP from primary_order_system."""
     if not system_value:
         return None
-    lower = system_value.lower()
-    erp_keywords = ["erp", "sap", "oracle", "netsuite", "dynamics", "jd edwards", "infor", "epicor", "sage"]
-    return "ERP" if any(kw in lower for kw in erp_keywords) else "Non-ERP"
+    return "ERP" if _ERP_RE.search(system_value) else "Non-ERP"
 
 
 def infer_has_auto_approval(credit_type_value):
     """Infer if auto-approval exists from credit_approval_type."""
     if not credit_type_value:
         return None
-    lower = credit_type_value.lower()
-    auto_keywords = ["auto", "automatic", "threshold", "under $", "below"]
-    return "Yes" if any(kw in lower for kw in auto_keywords) else "No"
+    return "Yes" if _AUTO_APPROVAL_RE.search(credit_type_value) else "No"
 
 
 def infer_has_manual_credit(credit_type_value):
@@ -228,11 +263,36 @@ def infer_has_manual_credit(credit_type_value):
     if not credit_type_value:
         return None
     lower = credit_type_value.lower()
-    manual_keywords = ["manual", "analyst", "review", "approve", "manager", "above", "over $"]
     # Also check if it's not purely auto
     if "only auto" in lower or "all auto" in lower:
         return "No"
-    return "Yes" if any(kw in lower for kw in manual_keywords) else "No"
+    return "Yes" if _MANUAL_CREDIT_RE.search(credit_type_value) else "No"
+
+
+class ChannelFlags(NamedTuple):
+    """Which intake channels an order_origin_channels answer mentions."""
+    manual: bool  # manual, email or PDF
+    portal: bool
+    b2b: bool
+    edi: bool
+
+
+def channel_flags(channels):
+    """Scan an order_origin_channels answer once; shared by conditions and diagrams."""
+    # Answers aren't always strings (an extraction may return a list), and
+    # the cache needs a hashable key
+    return _channel_flags(str(channels))
+
+
+@lru_cache(maxsize=64)
+def _channel_flags(channels):
+    lower = channels.lower()
+    return ChannelFlags(
+        manual="manual" in lower or "email" in lower or "pdf" in lower,
+        portal="portal" in lower,
+        b2b="b2b" in lower,
+        edi="edi" in lower,
+    )
 
 
 INFERENCE_FUNCTIONS = {
@@ -242,48 +302,78 @@ INFERENCE_FUNCTIONS = {
     "infer_has_manual_credit": infer_has_manual_credit,
 }
 
+# Inferred attributes grouped by the answer they are inferred from, as
+# source_key -> ((key, inference_func), ...) in flow order, built once
+_INFERENCES_BY_SOURCE = {}
+for q in QUESTION_FLOW:
+    if q["type"] == "I" and q.get("inference_from") and q.get("inference_logic") in INFERENCE_FUNCTIONS:
+        _INFERENCES_BY_SOURCE.setdefault(q["inference_from"], []).append(
+            (q["key"], INFERENCE_FUNCTIONS[q["inference_logic"]])
+        )
+_INFERENCES_BY_SOURCE = {source: tuple(targets) for source, targets in _INFERENCES_BY_SOURCE.items()}
+
 
 # ============ CONDITION FUNCTIONS ============
 
+def has_manual_intake_yes(collected_data):
+    """Manual order intake was reported."""
+    return collected_data.get("has_manual_intake") == "Yes"
+
+
+def has_automated_channel(collected_data):
+    """Orders arrive through EDI, a portal or B2B."""
+    flags = channel_flags(collected_data.get("order_origin_channels", ""))
+    return flags.edi or flags.portal or flags.b2b
+
+
+def has_auto_approval_yes(collected_data):
+    """Some orders are credit-approved automatically."""
+    return collected_data.get("has_auto_approval") == "Yes"
+
+
+def has_manual_credit_yes(collected_data):
+    """Some orders need manual credit approval."""
+    return collected_data.get("has_manual_credit") == "Yes"
+
+
+def has_manual_credit_and_manual_channel(collected_data):
+    """Manual credit approval and manual order intake both exist."""
+    has_manual_credit = collected_data.get("has_manual_credit") == "Yes"
+    has_manual_channel = collected_data.get("has_manual_intake") == "Yes"
+    return has_manual_credit and has_manual_channel
+
+
+CONDITION_FUNCTIONS = {
+    "has_manual_intake_yes": has_manual_intake_yes,
+    "has_automated_channel": has_automated_channel,
+    "has_auto_approval_yes": has_auto_approval_yes,
+    "has_manual_credit_yes": has_manual_credit_yes,
+    "has_manual_credit_and_manual_channel": has_manual_credit_and_manual_channel,
+}
+
+
 def check_condition(condition_name, collected_data):
     """Check if a condition is met based on collected data."""
     if condition_name is None:
         return True
     
-    if condition_name == "has_manual_intake_yes":
-        return collected_data.get("has_manual_intake") == "Yes"
-    
-    if condition_name == "has_automated_channel":
-        channels = collected_data.get("order_origin_channels", "").lower()
-        return "edi" in channels or "portal" in channels or "b2b" in channels
-    
-    if condition_name == "has_auto_approval_yes":
-        return collected_data.get("has_auto_approval") == "Yes"
-    
-    if condition_name == "has_manual_credit_yes":
-        return collected_data.get("has_manual_credit") == "Yes"
-    
-    if condition_name == "has_manual_credit_and_manual_channel":
-        has_manual_credit = collected_data.get("has_manual_credit") == "Yes"
-        has_manual_channel = collected_data.get("has_manual_intake") == "Yes"
-        return has_manual_credit and has_manual_channel
-    
-    return True
+    # Unknown conditions don't block a question
+    condition_func = CONDITION_FUNCTIONS.get(condition_name)
+    return condition_func(collected_data) if condition_func else True
 
 
 # ============ FLOW HELPER FUNCTIONS ============
 
 def run_inferences(collected_data):
     """Run all applicable inferences based on collected data."""
-    for q in QUESTION_FLOW:
-        if q["type"] == "I" and q.get("inference_from"):
-            source_key = q["inference_from"]
-            if source_key in collected_data and q["key"] not in collected_data:
-                inference_func = INFERENCE_FUNCTIONS.get(q.get("inference_logic"))
-                if inference_func:
-                    inferred_value = inference_func(collected_data[source_key])
-                    if inferred_value:
-                        collected_data[q["key"]] = inferred_value
+    for source_key, targets in _INFERENCES_BY_SOURCE.items():
+        if source_key not in collected_data:
+            continue  # Nothing to infer from yet
+        for key, inference_func in targets:
+            if key not in collected_data:
+                inferred_value = inference_func(collected_data[source_key])
+                if inferred_value:
+                    collected_data[key] = inferred_value
     return collected_data
 
 
@@ -293,51 +383,44 @@ def get_next_question_info(collected_data):
     collected_data = run_inferences(collected_data)
     
     # Find first unanswered mandatory question that meets its condition
-    for q in QUESTION_FLOW:
-        if q["type"] != "M":
-            continue  # Skip inferred questions
-        
-        if q["key"] in collected_data:
+    for key, condition in _MANDATORY:
+        if key in collected_data:
             continue  # Already answered
         
-        if not check_condition(q.get("condition"), collected_data):
+        if not check_condition(condition, collected_data):
             continue  # Condition not met, skip
         
-        return {
-            "id": q["id"],
-            "key": q["key"],
-            "question": q["question"],
-            "examples": q.get("examples", [])
-        }
+        return _QUESTION_INFO[key]
     
     return None  # All questions answered
 
 
+def iter_missing_attributes(collected_data):
+    """Lazily yield mandatory attributes not yet collected (that meet conditions)."""
+    collected_data = run_inferences(collected_data)
+    for key, condition in _MANDATORY:
+        if key not in collected_data and check_condition(condition, collected_data):
+            yield key
+
+
 def get_missing_attributes(collected_data):
     """Get list of mandatory attributes not yet collected (that meet conditions)."""
     collected_data = run_inferences(collected_data)
-    missing = []
-    
-    for q in QUESTION_FLOW:
-        if q["type"] != "M":
-            continue
-        if q["key"] in collected_data:
-            continue
-        if not check_condition(q.get("condition"), collected_data):
-            continue
-        missing.append(q["key"])
-    
-    return missing
+    return [
+        key for key, condition in _MANDATORY
+        if key not in collected_data and check_condition(condition, collected_data)
+    ]
 
 
 def get_all_attribute_keys():
     """Get all attribute keys in order."""
-    return [q["key"] for q in QUESTION_FLOW]
+    return _ALL_ATTRIBUTE_KEYS
 
 
 def is_complete(collected_data):
     """Check if all required questions are answered."""
-    return len(get_missing_attributes(collected_data)) == 0
+    # Stop at the first applicable unanswered question
+    return next(iter_missing_attributes(collected_data), None) is None
 
 
 def get_progress(collected_data):
@@ -347,13 +430,11 @@ def get_progress(collected_data):
     total = 0
     answered = 0
     
-    for q in QUESTION_FLOW:
-        if q["type"] != "M":
-            continue
-        if not check_condition(q.get("condition"), collected_data):
+    for key, condition in _MANDATORY:
+        if not check_condition(condition, collected_data):
             continue
         total += 1
-        if q["key"] in collected_data:
+        if key in collected_data:
             answered += 1
     
     return answered, total
@@ -2,6 +2,8 @@
 Generates Mermaid diagrams from captured O2C process data.
 """
 
+from attribute_schema import channel_flags
+
 def generate_process_diagram(collected_data):
     """
     Generate a Mermaid diagram based on captured process data.
@@ -18,8 +20,9 @@ def generate_process_diagram(collected_data):
     uses_erp = collected_data.get("uses_erp", "Unknown")
     
     has_manual = collected_data.get("has_manual_intake", "No") == "Yes"
-    has_portal = "portal" in channels.lower() or "b2b" in channels.lower()
-    has_edi = "edi" in channels.lower()
+    flags = channel_flags(channels)
+    has_portal = flags.portal or flags.b2b
+    has_edi = flags.edi
     
     credit_type = collected_data.get("credit_approval_type", "")
     has_auto = collected_data.get("has_auto_approval", "No") == "Yes"
@@ -29,62 +32,62 @@ def generate_process_diagram(collected_data):
     credit_factors = collected_data.get("credit_decision_factors", "AR balance, history")
     
     # Build the diagram
-    diagram = '''graph TD
+    parts = ['''graph TD
     %% Start
     Start((Order Received)) --> IntakeType{Intake Channel}
-'''
+''']
     
     # Intake channels
     if has_manual:
         manual_desc = f"Receive {manual_method}" if manual_method else "Manual Entry"
-        diagram += f'''
+        parts.append(f'''
     %% Manual Lane
     subgraph "{receiver} Lane"
     IntakeType -- Manual --> ManEntry["{manual_desc}"]
     ManEntry --> SystemEntry
     InformCust[Inform Customer]
     end
-'''
+''')
     
     if has_portal or has_edi:
-        diagram += '''
+        parts.append('''
     %% Automated Channels
     subgraph "Customer Pool"
-'''
+''')
         if has_portal:
-            diagram += '    Portal[Submit via B2B Portal]\n'
+            parts.append('    Portal[Submit via B2B Portal]\n')
         if has_edi:
-            diagram += '    EDI[Send EDI Order]\n'
-        diagram += '    end\n'
+            parts.append('    EDI[Send EDI Order]\n')
+        parts.append('    end\n')
         
         if has_portal:
-            diagram += '    IntakeType -- Portal --> Portal\n'
-            diagram += '    Portal --> SystemEntry\n'
+            parts.append('    IntakeType -- Portal --> Portal\n')
+            parts.append('    Portal --> SystemEntry\n')
         if has_edi:
-            diagram += '    IntakeType -- EDI --> EDI\n'
-            diagram += '    EDI --> SystemEntry\n'
+            parts.append('    IntakeType -- EDI --> EDI\n')
+            parts.append('    EDI --> SystemEntry\n')
     
     # ERP/System processing
     system_label = f"{system}" if uses_erp == "ERP" else f"{system}"
-    diagram += f'''
+    parts.append(f'''
     %% System Processing
     subgraph "{system_label} Lane"
     SystemEntry[Create Order Record]
     CreditGate{{Credit Check}}
     SystemEntry --> CreditGate
-'''
+''')
     
     # Credit logic
     if has_auto:
-        diagram += f'    CreditGate -- "< {auto_limit}" --> AutoApprove[Auto-Approve]\n'
+        parts.append(f'    CreditGate -- "< {auto_limit}" --> AutoApprove[Auto-Approve]\n')
     
     if has_manual_credit:
-        diagram += f'    CreditGate -- "Above threshold" --> FlagQueue[Flag for Review]\n'
-        diagram += '    UpdateStatus[Update Status]\n'
-        diagram += '    end\n'
+        parts.append(f'    CreditGate -- "Above threshold" --> FlagQueue[Flag for Review]\n')
+        parts.append('    UpdateStatus[Update Status]\n')
+        parts.append('    end\n')
         
         # Credit analyst lane
-        diagram += f'''
+        parts.append(f'''
     %% Credit Review Lane
     subgraph "{credit_approver} Lane"
     FlagQueue --> Review[Review Dashboard]
@@ -94,19 +97,19 @@ def generate_process_diagram(collected_data):
     Decision -- Reject --> UpdateStatus
     Decision -- Conditional --> UpdateStatus
     end
-'''
+''')
     else:
-        diagram += '    end\n'
+        parts.append('    end\n')
     
     # End flow
     if has_auto:
-        diagram += '    AutoApprove --> EndProcess((Continue to Fulfillment))\n'
+        parts.append('    AutoApprove --> EndProcess((Continue to Fulfillment))\n')
     if has_manual_credit:
-        diagram += '    UpdateStatus --> EndProcess\n'
+        parts.append('    UpdateStatus --> EndProcess\n')
     elif not has_auto:
-        diagram += '    CreditGate --> EndProcess((Continue to Fulfillment))\n'
+        parts.append('    CreditGate --> EndProcess((Continue to Fulfillment))\n')
     
-    return diagram
+    return "".join(parts)
 
 
 def get_simple_diagram(collected_data):
@@ -116,34 +119,34 @@ def get_simple_diagram(collected_data):
     if len(collected_data) < 3:
         return None
     
-    diagram = '''graph LR
+    parts = ['''graph LR
     A[Order Received] --> B{Channel}
-'''
+''']
     
-    channels = collected_data.get("order_origin_channels", "")
-    if "manual" in channels.lower() or "email" in channels.lower() or "pdf" in channels.lower():
-        diagram += '    B --> C[Manual Entry]\n'
-    if "portal" in channels.lower() or "b2b" in channels.lower():
-        diagram += '    B --> D[Portal]\n'
-    if "edi" in channels.lower():
-        diagram += '    B --> E[EDI]\n'
+    flags = channel_flags(collected_data.get("order_origin_channels", ""))
+    if flags.manual:
+        parts.append('    B --> C[Manual Entry]\n')
+    if flags.portal or flags.b2b:
+        parts.append('    B --> D[Portal]\n')
+    if flags.edi:
+        parts.append('    B --> E[EDI]\n')
     
     system = collected_data.get("primary_order_system", "")
     if system:
-        diagram += f'    C --> F[{system}]\n'
-        diagram += f'    D --> F\n'
-        diagram += f'    E --> F\n'
+        parts.append(f'    C --> F[{system}]\n')
+        parts.append(f'    D --> F\n')
+        parts.append(f'    E --> F\n')
     
     credit = collected_data.get("credit_approval_type", "")
     if credit:
-        diagram += '    F --> G{Credit Check}\n'
+        parts.append('    F --> G{Credit Check}\n')
         if "auto" in credit.lower():
-            diagram += '    G --> H[Auto-Approve]\n'
+            parts.append('    G --> H[Auto-Approve]\n')
         if "manual" in credit.lower():
-            diagram += '    G --> I[Manual Review]\n'
-        diagram += '    H --> J((Fulfillment))\n'
-        diagram += '    I --> J\n'
+            parts.append('    G --> I[Manual Review]\n')
+        parts.append('    H --> J((Fulfillment))\n')
+        parts.append('    I --> J\n')
     else:
-        diagram += '    F --> J((Fulfillment))\n'
+        parts.append('    F --> J((Fulfillment))\n')
     
-    return diagram
+    return "".join(parts)
@@ -7,8 +7,42 @@ Generates:
 2. Summary text explaining gaps and recommendations
 """
 
+import re
+
+from attribute_schema import channel_flags
 from sap_standard import SAP_BEST_PRACTICES
 
+# Keyword checks used by analyze_gaps, compiled once
+_MANUAL_PROCESS_RE = re.compile(r"manual|paper|email|spreadsheet|excel", re.IGNORECASE)
+_FRAGMENTATION_RE = re.compile(r"separate|different system|re-key|manual entry", re.IGNORECASE)
+_MANUAL_NOTIFY_RE = re.compile(r"phone|calls|email", re.IGNORECASE)
+_AUTOMATED_STD_RE = re.compile(r"automated|system|real-time", re.IGNORECASE)
+_ALERTING_STD_RE = re.compile(r"automated|dashboard", re.IGNORECASE)
+
+# Gap attributes that trigger each recommendation in generate_gap_summary
+_MANUAL_INTAKE_GAPS = frozenset({"manual_intake_method", "manual_data_verification"})
+_NOTIFICATION_GAPS = frozenset({"credit_decision_to_sales", "credit_decision_to_customer"})
+
+# Per attribute: (standard is automated, standard uses alerts); the standards are fixed
+_STANDARD_FLAGS = {
+    attr_key: (
+        bool(_AUTOMATED_STD_RE.search(best_practice["standard"])),
+        bool(_ALERTING_STD_RE.search(best_practice["standard"])),
+    )
+    for attr_key, best_practice in SAP_BEST_PRACTICES.items()
+}
+
+# "Not yet captured" entry per attribute; analyze_gaps hands out copies
+_MISSING_ENTRIES = {
+    attr_key: {
+        "attribute": attr_key,
+        "standard": best_practice["standard"],
+        "risk": best_practice["risk_if_missing"],
+        "issue": "Not yet captured"
+    }
+    for attr_key, best_practice in SAP_BEST_PRACTICES.items()
+}
+
 
 def analyze_gaps(collected_data):
     """
@@ -28,17 +62,12 @@ def analyze_gaps(collected_data):
     for attr_key, best_practice in SAP_BEST_PRACTICES.items():
         if attr_key not in collected_data:
             # Missing attribute = gap
-            missing.append({
-                "attribute": attr_key,
-                "standard": best_practice["standard"],
-                "risk": best_practice["risk_if_missing"],
-                "issue": "Not yet captured"
-            })
+            missing.append(_MISSING_ENTRIES[attr_key].copy())
             continue
         
         current_value = collected_data[attr_key]
-        std = best_practice["standard"].lower()
-        current = str(current_value).lower()
+        automated_std, alerting_std = _STANDARD_FLAGS[attr_key]
+        current = str(current_value)
         
         # Analyze alignment
         gap_info = {
@@ -52,30 +81,29 @@ def analyze_gaps(collected_data):
         is_gap = False
         
         # Check for manual/paper processes
-        if any(word in current for word in ["manual", "paper", "email", "spreadsheet", "excel"]):
-            if "automated" in std or "system" in std or "real-time" in std:
+        if _MANUAL_PROCESS_RE.search(current):
+            if automated_std:
                 is_gap = True
                 gap_info["issue"] = "Manual process vs automated standard"
         
         # Check for low success rates
         if attr_key == "verification_success_rate":
-            try:
-                rate = int(''.join(filter(str.isdigit, current[:3])))
-                if rate < 90:
-                    is_gap = True
-                    gap_info["issue"] = f"Success rate {rate}% below 95% target"
-            except:
-                pass
+            # Digits within the first 3 characters, e.g. "85%" or "~90"
+            digits = ''.join(filter(str.isdecimal, current[:3]))
+            rate = int(digits) if digits else None
+            if rate is not None and rate < 90:
+                is_gap = True
+                gap_info["issue"] = f"Success rate {rate}% below 95% target"
         
         # Check for missing integration
-        if any(word in current for word in ["separate", "different system", "re-key", "manual entry"]):
+        if _FRAGMENTATION_RE.search(current):
             is_gap = True
             gap_info["issue"] = "System fragmentation vs integrated approach"
         
         # Check credit governance
         if attr_key in ["credit_decision_to_sales", "credit_decision_to_customer"]:
-            if any(word in current for word in ["phone", "calls", "email"]):
-                if "automated" in std or "dashboard" in std:
+            if _MANUAL_NOTIFY_RE.search(current):
+                if alerting_std:
                     is_gap = True
                     gap_info["issue"] = "Manual notification vs automated alerts"
         
@@ -113,7 +141,12 @@ def generate_gap_diagram(collected_data, gap_analysis):
     
     gaps_set = {g["attribute"] for g in gap_analysis.get("gaps", [])}
     
-    diagram = '''graph TD
+    # Answers read more than once below
+    has_manual_intake = collected_data.get("has_manual_intake") == "Yes"
+    has_auto_approval = collected_data.get("has_auto_approval") == "Yes"
+    has_manual_credit = collected_data.get("has_manual_credit") == "Yes"
+    
+    parts = ['''graph TD
     %% GAP Analysis: Color-coded
     %% Green = Aligned, Red = Gap, Yellow = Partial
     
@@ -123,58 +156,59 @@ def generate_gap_diagram(collected_data, gap_analysis):
     classDef default fill:#6c757d,stroke:#545b62,color:#fff
     
     Start((Order Received)) --> IntakeChannel
-'''
+''']
     
     # Order Intake section
     has_channels = "order_origin_channels" in collected_data
     channel_class = "red" if "order_origin_channels" in gaps_set else ("green" if has_channels else "default")
-    diagram += f'    IntakeChannel{{{{"Channel Type"}}}}:::{channel_class}\n'
+    parts.append(f'    IntakeChannel{{{{"Channel Type"}}}}:::{channel_class}\n')
     
-    if collected_data.get("has_manual_intake") == "Yes":
+    if has_manual_intake:
         manual_class = "red" if "manual_intake_method" in gaps_set else "green"
-        diagram += f'    IntakeChannel --> ManualIntake["Manual: {collected_data.get("manual_intake_method", "Email/PDF")[:20]}"]:::{manual_class}\n'
+        parts.append(f'    IntakeChannel --> ManualIntake["Manual: {collected_data.get("manual_intake_method", "Email/PDF")[:20]}"]:::{manual_class}\n')
     
-    has_auto = "portal" in str(collected_data.get("order_origin_channels", "")).lower() or \
-               "edi" in str(collected_data.get("order_origin_channels", "")).lower()
+    flags = channel_flags(collected_data.get("order_origin_channels", ""))
+    has_auto = flags.portal or flags.edi
     if has_auto:
         auto_class = "green"
-        diagram += f'    IntakeChannel --> AutoIntake["Portal/EDI"]:::{auto_class}\n'
-        diagram += '    ManualIntake --> OrderCreated\n' if collected_data.get("has_manual_intake") == "Yes" else ''
-        diagram += '    AutoIntake --> OrderCreated\n'
+        parts.append(f'    IntakeChannel --> AutoIntake["Portal/EDI"]:::{auto_class}\n')
+        if has_manual_intake:
+            parts.append('    ManualIntake --> OrderCreated\n')
+        parts.append('    AutoIntake --> OrderCreated\n')
     else:
-        diagram += '    ManualIntake --> OrderCreated\n' if collected_data.get("has_manual_intake") == "Yes" else '    IntakeChannel --> OrderCreated\n'
+        parts.append('    ManualIntake --> OrderCreated\n' if has_manual_intake else '    IntakeChannel --> OrderCreated\n')
     
     # System
     system_class = "green" if collected_data.get("uses_erp") == "ERP" else "yellow"
     system_name = collected_data.get("primary_order_system", "System")[:15]
-    diagram += f'    OrderCreated["{system_name}"]:::{system_class}\n'
+    parts.append(f'    OrderCreated["{system_name}"]:::{system_class}\n')
     
     # Verification
     verify_class = "red" if "verification_success_rate" in gaps_set else "green"
     verify_rate = collected_data.get("verification_success_rate", "Unknown")
-    diagram += f'    OrderCreated --> Verification{{{{"Data Verification"}}}}:::{verify_class}\n'
+    parts.append(f'    OrderCreated --> Verification{{{{"Data Verification"}}}}:::{verify_class}\n')
     
     # Credit
-    credit_class = "green" if collected_data.get("has_auto_approval") == "Yes" else "yellow"
-    diagram += f'    Verification --> CreditCheck{{{{"Credit Check"}}}}:::{credit_class}\n'
+    credit_class = "green" if has_auto_approval else "yellow"
+    parts.append(f'    Verification --> CreditCheck{{{{"Credit Check"}}}}:::{credit_class}\n')
     
-    if collected_data.get("has_auto_approval") == "Yes":
+    if has_auto_approval:
         limit = collected_data.get("auto_approval_limit", "$50k")[:10]
-        diagram += f'    CreditCheck -- "<{limit}" --> AutoApprove[Auto-Approve]:::green\n'
+        parts.append(f'    CreditCheck -- "<{limit}" --> AutoApprove[Auto-Approve]:::green\n')
     
-    if collected_data.get("has_manual_credit") == "Yes":
+    if has_manual_credit:
         manual_credit_class = "red" if "credit_decision_to_sales" in gaps_set or "credit_decision_to_customer" in gaps_set else "green"
         approver = collected_data.get("manual_credit_approver", "Analyst")[:15]
-        diagram += f'    CreditCheck -- "Above limit" --> ManualReview["{approver}"]:::{manual_credit_class}\n'
-        diagram += f'    ManualReview --> Decision{{{{"Decision"}}}}:::{manual_credit_class}\n'
-        diagram += '    Decision --> Released\n'
+        parts.append(f'    CreditCheck -- "Above limit" --> ManualReview["{approver}"]:::{manual_credit_class}\n')
+        parts.append(f'    ManualReview --> Decision{{{{"Decision"}}}}:::{manual_credit_class}\n')
+        parts.append('    Decision --> Released\n')
     
-    if collected_data.get("has_auto_approval") == "Yes":
-        diagram += '    AutoApprove --> Released\n'
+    if has_auto_approval:
+        parts.append('    AutoApprove --> Released\n')
     
-    diagram += '    Released((Order Released)):::green\n'
+    parts.append('    Released((Order Released)):::green\n')
     
-    return diagram
+    return "".join(parts)
 
 
 def generate_gap_summary(gap_analysis):
@@ -188,51 +222,58 @@ def generate_gap_summary(gap_analysis):
     captured = gap_analysis.get("captured_count", 0)
     total_req = gap_analysis.get("total_required", 16)
     
-    summary = "## GAP Analysis Summary\n\n"
-    summary += f"**Progress:** {captured}/{total_req} process areas captured\n\n"
+    parts = [
+        "## GAP Analysis Summary\n\n"
+        f"**Progress:** {captured}/{total_req} process areas captured\n\n"
+    ]
     
     if score >= 80:
-        summary += "✅ **Overall: Strong alignment with SAP best practices**\n\n"
+        parts.append("✅ **Overall: Strong alignment with SAP best practices**\n\n")
     elif score >= 50:
-        summary += "⚠️ **Overall: Moderate alignment, improvement opportunities exist**\n\n"
+        parts.append("⚠️ **Overall: Moderate alignment, improvement opportunities exist**\n\n")
     else:
-        summary += "🔴 **Overall: Continue interview to capture more process details**\n\n"
+        parts.append("🔴 **Overall: Continue interview to capture more process details**\n\n")
     
     # Missing attributes (not yet captured)
     if missing:
-        summary += "### ⚫ Not Yet Captured\n\n"
-        summary += "*Complete the interview to capture these areas:*\n\n"
+        parts.append("### ⚫ Not Yet Captured\n\n")
+        parts.append("*Complete the interview to capture these areas:*\n\n")
         for m in missing[:5]:  # Show first 5
-            summary += f"- {m['attribute'].replace('_', ' ').title()}\n"
+            parts.append(f"- {m['attribute'].replace('_', ' ').title()}\n")
         if len(missing) > 5:
-            summary += f"- *...and {len(missing) - 5} more*\n"
-        summary += "\n"
+            parts.append(f"- *...and {len(missing) - 5} more*\n")
+        parts.append("\n")
     
     # Gaps in captured data
     if gaps:
-        summary += "### 🔴 Gaps Identified\n\n"
+        parts.append("### 🔴 Gaps Identified\n\n")
         for i, gap in enumerate(gaps, 1):
-            summary += f"**{i}. {gap['attribute'].replace('_', ' ').title()}**\n"
-            summary += f"   - *Current:* {gap['current']}\n"
-            summary += f"   - *Standard:* {gap['standard']}\n"
-            summary += f"   - *Issue:* {gap.get('issue', 'Deviation from best practice')}\n"
-            summary += f"   - *Risk:* {gap['risk']}\n\n"
+            parts.append(
+                f"**{i}. {gap['attribute'].replace('_', ' ').title()}**\n"
+                f"   - *Current:* {gap['current']}\n"
+                f"   - *Standard:* {gap['standard']}\n"
+                f"   - *Issue:* {gap.get('issue', 'Deviation from best practice')}\n"
+                f"   - *Risk:* {gap['risk']}\n\n"
+            )
     
     if strengths:
-        summary += "### ✅ Areas of Strength\n\n"
+        parts.append("### ✅ Areas of Strength\n\n")
         for s in strengths[:5]:  # Show top 5
-            summary += f"- **{s['attribute'].replace('_', ' ').title()}**: {str(s['current'])[:50]}\n"
+            parts.append(f"- **{s['attribute'].replace('_', ' ').title()}**: {str(s['current'])[:50]}\n")
     
     if gaps or missing:
-        summary += "\n### 💡 Recommendations\n\n"
+        parts.append("\n### 💡 Recommendations\n\n")
         
         if missing:
-            summary += "1. **Complete Discovery**: Continue the interview to capture all process areas\n"
+            parts.append("1. **Complete Discovery**: Continue the interview to capture all process areas\n")
+        
+        # One pass over the gaps serves both recommendation checks
+        gap_attributes = {g.get("attribute") for g in gaps}
         
-        if any(g.get("attribute") in ["manual_intake_method", "manual_data_verification"] for g in gaps):
-            summary += "2. **Automate Manual Intake**: Consider implementing OCR/email parsing\n"
+        if not gap_attributes.isdisjoint(_MANUAL_INTAKE_GAPS):
+            parts.append("2. **Automate Manual Intake**: Consider implementing OCR/email parsing\n")
         
-        if any(g.get("attribute") in ["credit_decision_to_sales", "credit_decision_to_customer"] for g in gaps):
-            summary += "3. **Implement Automated Notifications**: Move from phone/email to dashboard alerts\n"
+        if not gap_attributes.isdisjoint(_NOTIFICATION_GAPS):
+            parts.append("3. **Implement Automated Notifications**: Move from phone/email to dashboard alerts\n")
     
-    return summary
+    return "".join(parts)
@@ -1,10 +1,17 @@
 import os
-from openai import OpenAI
+import re
+from functools import lru_cache
+import httpx2
+from openai import OpenAI, DefaultHttpxClient, NOT_GIVEN, Timeout
 import json
 
+from attribute_schema import QUESTION_FLOW
+
 # Initialize the client (can be set via parameter or TOGETHER_API_KEY env var)
 _client = None
 _api_key = None
+# Pooled HTTP/2 connections, kept warm across clients and API key changes
+_http_client = None
 
 # Available models
 AVAILABLE_MODELS = {
@@ -12,18 +19,52 @@ AVAILABLE_MODELS = {
     "Qwen 2.5 7B (Faster)": "Qwen/Qwen2.5-7B-Instruct-Turbo",
 }
 _model_name = "Qwen/Qwen2.5-72B-Instruct-Turbo"  # Default
+# One-word intent classification doesn't need the large model
+ROUTER_MODEL = AVAILABLE_MODELS["Qwen 2.5 7B (Faster)"]
+# Words that only come up when the user is talking about an order process
+_ORDER_KEYWORDS_RE = re.compile(
+    r"\b(?:orders?|purchase orders?|PO|SAP|EDI|invoices?|credit check|quotations?|"
+    r"deliver(?:y|ies)|SKUs?|customers?)\b",
+    re.IGNORECASE,
+)
+# Natural phrasings of the long QUESTION_FLOW questions by question id,
+# written ahead of time (see precompute_rephrased_questions.py)
+REPHRASED_QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rephrased_questions.json")
+try:
+    with open(REPHRASED_QUESTIONS_PATH) as f:
+        _REPHRASED_QUESTIONS = json.load(f)
+except FileNotFoundError:
+    _REPHRASED_QUESTIONS = {}
+# Server-side guarantee that extraction replies are a single JSON object
+JSON_MODE = {"type": "json_object"}
 
 def set_api_key(key):
     """Set the API key programmatically (e.g., from Streamlit input)."""
     global _api_key, _client
+    if key == _api_key:
+        return  # Called on every rerun; keep the existing client
     _api_key = key
     _client = None  # Reset client so it gets recreated with new key
+    _route_cached.cache_clear()  # Drop answers given without a working key
 
 def set_model(model_name):
     """Set the model to use for LLM calls."""
     global _model_name
     _model_name = model_name
 
+def get_http_client():
+    """Shared HTTP/2 connection pool used by every client from get_client."""
+    global _http_client
+    if _http_client is None:
+        _http_client = DefaultHttpxClient(
+            http2=True,
+            # Users take longer than the 5s default between turns
+            limits=httpx2.Limits(max_keepalive_connections=8, max_connections=16, keepalive_expiry=60.0),
+            # Fail fast on connect; completions still get a minute
+            timeout=Timeout(60.0, connect=5.0),
+        )
+    return _http_client
+
 def get_client():
     global _client, _api_key
     if _client is None:
@@ -34,12 +75,15 @@ def get_client():
         _client = OpenAI(
             api_key=api_key,
             base_url="https://api.together.xyz/v1",
+            http_client=get_http_client(),
         )
     return _client
 
-def call_qwen(messages, temperature=0.0):
+def call_qwen(messages, temperature=0.0, model=None, response_format=None):
     """
     Calls the Qwen model via Together API.
+    model overrides the selected model for this call.
+    response_format, e.g. {"type": "json_object"}, constrains the output.
     """
     global _model_name
     client = get_client()
@@ -48,9 +92,10 @@ def call_qwen(messages, temperature=0.0):
 
     try:
         response = client.chat.completions.create(
-            model=_model_name,
+            model=model or _model_name,
             messages=messages,
             temperature=temperature,
+            response_format=response_format or NOT_GIVEN,
         )
         return response.choices[0].message.content
     except Exception as e:
@@ -58,11 +103,53 @@ def call_qwen(messages, temperature=0.0):
         return None
 
 
+def call_qwen_stream(messages, temperature=0.0):
+    """
+    Streams the Qwen model response via Together API, yielding text deltas
+    as they arrive.
+    """
+    global _model_name
+    client = get_client()
+    if not client:
+        yield "Error: API key not set."
+        return
+
+    try:
+        stream = client.chat.completions.create(
+            model=_model_name,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"Error calling LLM: {e}")
+
+
 def route_query(user_input):
     """
     Decides if the query is for Order Management or Other.
     Returns: 'ORDER_MGMT' or 'OTHER'
     """
+    # Domain vocabulary settles it without a round-trip
+    if _ORDER_KEYWORDS_RE.search(user_input):
+        return "ORDER_MGMT"
+    
+    try:
+        return _route_cached(user_input)
+    except ConnectionError:
+        return "OTHER"
+
+
+@lru_cache(maxsize=1024)
+def _route_cached(user_input):
+    """
+    route_query's classification, cached per message: it is deterministic
+    (temperature 0, fixed router model). A failed call raises instead of
+    returning, so it is not cached.
+    """
     system_prompt = (
         "Classify the user's intent.\n"
         "ORDER_MGMT = user wants to report, log, or discuss an order process\n"
@@ -75,41 +162,60 @@ def route_query(user_input):
         {"role": "user", "content": user_input}
     ]
     
-    response = call_qwen(messages)
-    if response and "ORDER" in response.upper():
+    response = call_qwen(messages, model=ROUTER_MODEL)
+    if response is None:
+        raise ConnectionError("Routing call failed")
+    if "ORDER" in response.upper():
         return "ORDER_MGMT"
     return "OTHER"
 
 
-def extract_all_mentioned_attributes(user_input, attribute_schema, conversation_history="", expected_key=None):
+def route_and_extract(user_input):
     """
-    Extracts ALL process information from user response.
-    Captures multiple attributes if user provides rich answers.
+    Routes a message and extracts any process information it mentions in a
+    single LLM call, saving the separate routing round-trip for messages
+    that already carry answers.
+    Returns: (intent, extracted) where intent is 'ORDER_MGMT' or 'OTHER'
     """
-    from attribute_schema import QUESTION_FLOW
+    # Order vocabulary routes locally, as in route_query; the LLM only extracts
+    if _ORDER_KEYWORDS_RE.search(user_input):
+        return "ORDER_MGMT", extract_all_mentioned_attributes(user_input, attribute_schema=None)
     
-    # Build list of ALL attributes we might find (focus on unanswered ones)
-    attr_list = []
-    for q in QUESTION_FLOW:
-        if q["type"] == "M" and q.get("question"):
-            key = q["key"]
-            examples = q.get("examples", [])
-            attr_list.append({
-                "key": key,
-                "question": q["question"],
-                "examples": examples[:2]
-            })
+    system_prompt = (
+        "Decide the user's intent and extract ORDER PROCESS information from their message.\n"
+        "ORDER_MGMT = user wants to report, log, or discuss an order process\n"
+        "OTHER = anything else\n\n"
+        f"ATTRIBUTES TO LOOK FOR:\n{_attribute_descriptions()}\n\n"
+        "RULES:\n"
+        "1. Extract EVERY attribute the user mentions, not just one\n"
+        "2. Only extract attributes when the intent is ORDER_MGMT\n"
+        "3. Return valid JSON only, in this shape:\n"
+        "{\"intent\": \"ORDER_MGMT\", \"extracted\": {\"order_origin_channels\": \"EDI from retailers\"}}\n"
+        "4. If no attributes are found, use \"extracted\": {}"
+    )
     
-    # Build the extraction prompt to find ALL mentioned attributes
-    attr_descriptions = "\n".join([
-        f"- {a['key']}: {a['question'][:50]}... (e.g., {', '.join(a['examples'][:2]) if a['examples'] else 'any value'})"
-        for a in attr_list[:20]
-    ])
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"USER'S ANSWER: {user_input}"}
+    ]
     
+    result = _parse_json_object(call_qwen(messages, temperature=0.0, response_format=JSON_MODE))
+    if "ORDER" not in str(result.get("intent", "")).upper():
+        return "OTHER", {}
+    
+    extracted = result.get("extracted")
+    return "ORDER_MGMT", extracted if isinstance(extracted, dict) else {}
+
+
+def extract_all_mentioned_attributes(user_input, attribute_schema, conversation_history="", expected_key=None):
+    """
+    Extracts ALL process information from user response.
+    Captures multiple attributes if user provides rich answers.
+    """
     system_prompt = (
         "You are extracting ORDER PROCESS information from a client interview.\n"
         "The user may mention MULTIPLE things in one response. Extract ALL that apply.\n\n"
-        f"ATTRIBUTES TO LOOK FOR:\n{attr_descriptions}\n\n"
+        f"ATTRIBUTES TO LOOK FOR:\n{_attribute_descriptions()}\n\n"
         "RULES:\n"
         "1. Extract EVERY attribute the user mentions, not just one\n"
         "2. Even brief mentions count (e.g., 'PDF' → manual_intake_method: 'PDF')\n"
@@ -133,42 +239,89 @@ def extract_all_mentioned_attributes(user_input, attribute_schema, conversation_
         {"role": "user", "content": user_message}
     ]
     
-    response = call_qwen(messages, temperature=0.0)
+    return _parse_json_object(call_qwen(messages, temperature=0.0, response_format=JSON_MODE))
+
+
+@lru_cache(maxsize=None)
+def _attribute_descriptions():
+    """
+    Lists the mandatory attributes, with examples, for extraction prompts.
+    QUESTION_FLOW is fixed, so this is built once per process.
+    """
+    # Build list of ALL attributes we might find (focus on unanswered ones)
+    attr_list = []
+    for q in QUESTION_FLOW:
+        if q["type"] == "M" and q.get("question"):
+            key = q["key"]
+            examples = q.get("examples", [])
+            attr_list.append({
+                "key": key,
+                "question": q["question"],
+                "examples": examples[:2]
+            })
+    
+    return "\n".join([
+        f"- {a['key']}: {a['question'][:50]}... (e.g., {', '.join(a['examples'][:2]) if a['examples'] else 'any value'})"
+        for a in attr_list[:20]
+    ])
+
+
+def _parse_json_object(response):
+    """Parses a JSON mode response; {} if it is empty or not an object."""
     if not response:
         return {}
     
-    # Parse JSON from response
-    response = response.strip()
     try:
-        if "{" in response:
-            start = response.index("{")
-            end = response.rindex("}") + 1
-            json_str = response[start:end]
-            return json.loads(json_str)
-        return {}
-    except (json.JSONDecodeError, ValueError) as e:
+        result = json.loads(response)
+    except json.JSONDecodeError as e:
         print(f"Warning: JSON parse error: {e}")
         return {}
+    return result if isinstance(result, dict) else {}
 
 
-def generate_next_question(question_info, collected_data, conversation_history=""):
+def generate_next_question_stream(question_info, collected_data, conversation_history=""):
     """
-    Generates a natural version of the next question.
+    Generates a natural version of the next question, yielding the text in
+    chunks as the LLM produces them.
     
     question_info: Dict with id, key, question, examples
     collected_data: What we've collected so far
     conversation_history: Recent conversation for context
     """
-    
     base_question = question_info.get("question", "")
     examples = question_info.get("examples", [])
     q_id = question_info.get("id", "")
     
-    # For simple questions, just return them directly with minor variation
+    # For simple questions, just return them directly
     if len(base_question.split()) < 15:
-        return base_question
+        yield base_question
+        return
     
-    # For longer questions, use LLM to rephrase naturally
+    # Flow questions are rephrased ahead of time
+    if q_id in _REPHRASED_QUESTIONS:
+        yield _REPHRASED_QUESTIONS[q_id]
+        return
+    
+    # For longer questions, use LLM to rephrase naturally. Hold back the
+    # first few characters so a too-short rephrasing can still fall back to
+    # the original question.
+    buffered = ""
+    started = False
+    for delta in call_qwen_stream(_rephrase_messages(base_question, examples), temperature=0.5):
+        if started:
+            yield delta
+            continue
+        buffered += delta
+        if len(buffered.strip()) > 10:
+            started = True
+            yield buffered.lstrip()
+    
+    if not started:
+        yield base_question
+
+
+def _rephrase_messages(base_question, examples):
+    """Builds the LLM messages used to rephrase a question naturally."""
     system_prompt = (
         "You are a consultant conducting a process discovery interview.\n"
         "Rephrase the following question to sound natural and conversational.\n"
@@ -178,17 +331,10 @@ def generate_next_question(question_info, collected_data, conversation_history="
         f"Examples of valid answers: {', '.join(examples[:2]) if examples else 'N/A'}"
     )
     
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": "Rephrase this question naturally."}
     ]
-    
-    response = call_qwen(messages, temperature=0.5)
-    
-    if response and len(response) > 10:
-        return response.strip()
-    
-    return base_question
 
 
 def assess_conversation_style(conversation_history, recent_responses):
@@ -1,4 +1,4 @@
-from llm_utils import route_query, call_qwen
+from llm_utils import route_query, route_and_extract, call_qwen
 from order_mgmt import OrderManager
 
 class Orchestrator:
@@ -10,6 +10,14 @@ class Orchestrator:
         Main entry point for handling user messages.
         session_state: A dictionary-like object (streamlit session state)
         """
+        return "".join(self.handle_message_stream(user_input, session_state))
+
+    def handle_message_stream(self, user_input, session_state):
+        """
+        Streaming variant of handle_message: yields the response in chunks
+        as the LLM produces them, so the UI can render from the first token.
+        session_state: A dictionary-like object (streamlit session state)
+        """
         
         # Ensure 'mode' exists
         if "mode" not in session_state:
@@ -24,22 +32,26 @@ class Orchestrator:
                 # Should not happen if logic is correct, but safe fallback
                 response, new_state = self.order_manager.start_conversation()
                 session_state["order_state"] = new_state
-                return response
+                yield response
+                return
             
-            # Delegate to OrderManager
-            response, updated_state = self.order_manager.process_input(user_input, session_state["order_state"])
-            session_state["order_state"] = updated_state
+            # Delegate to OrderManager (state is updated in place)
+            updated_state = session_state["order_state"]
+            yield from self.order_manager.process_input_stream(user_input, updated_state)
             
             # Check if flow finished
-            if not updated_state.get("active", False):
+            if not updated_state.active:
                 session_state["mode"] = "GENERAL"
                 # session_state["order_state"] = None # clean up if desired, or keep history
-            
-            return response
 
         # 2. General Mode - Check Routing
         else:
-            intent = route_query(user_input)
+            # A message with more than just a trigger phrase may already
+            # answer questions; route and extract it in one LLM call
+            if len(user_input.split()) > 5:
+                intent, extracted = route_and_extract(user_input)
+            else:
+                intent, extracted = route_query(user_input), None
             
             if intent == "ORDER_MGMT":
                 # Switch to Order Management
@@ -48,16 +60,16 @@ class Orchestrator:
                 session_state["order_state"] = start_state
                 
                 # Check if the initial message contains data (not just "log order" or similar)
-                # If it does, process it for extraction before returning
-                if len(user_input.split()) > 5:  # More than just a trigger phrase
-                    # Process the initial message to extract any data it contains
-                    response, updated_state = self.order_manager.process_input(user_input, session_state["order_state"])
-                    session_state["order_state"] = updated_state
-                    return f"I can help with that. {response}"
+                # If it does, record what was extracted from it before returning
+                if extracted is not None:
+                    yield "I can help with that. "
+                    yield from self.order_manager.process_input_stream(
+                        user_input, session_state["order_state"], extracted=extracted
+                    )
                 else:
-                    return f"I can help with that. {response}"
+                    yield f"I can help with that. {response}"
             
             else:
                 # General Chat - Static Refusal
                 # "acknowledge the question and say we dont support it"
-                return "I'm sorry, I'm only capable of helping with order management and O2C process reporting. Please let me know if you'd like to report an order."
+                yield "I'm sorry, I'm only capable of helping with order management and O2C process reporting. Please let me know if you'd like to report an order."
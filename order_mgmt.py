@@ -5,16 +5,36 @@ Manages the conversation flow for Order Management process discovery.
 Uses hierarchical question flow with conditional branching.
 """
 
-from attribute_schema import (
-    REQUIRED_ATTRIBUTES, QUESTION_FLOW,
-    get_next_question_info, get_missing_attributes, is_complete,
-    run_inferences, get_progress, INFERENCE_FUNCTIONS
-)
-from llm_utils import (
-    extract_all_mentioned_attributes,
-    generate_next_question,
-    assess_conversation_style
-)
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from attribute_schema import REQUIRED_ATTRIBUTES, QUESTION_KEY_BY_ID, get_next_question_info
+from llm_utils import extract_all_mentioned_attributes, generate_next_question_stream
+
+
+# Lines of conversation kept for prompts (3 Bot/User exchanges)
+HISTORY_WINDOW = 6
+
+
+def _history():
+    return deque(maxlen=HISTORY_WINDOW)
+
+
+@dataclass(slots=True)
+class OrderState:
+    """
+    Per-conversation state of the Order Management flow. Only the last
+    HISTORY_WINDOW lines of conversation are kept; collected_data carries
+    everything learned from older turns.
+    """
+    active: bool = True
+    collected_data: dict = field(default_factory=dict)
+    conversation_history: deque = field(default_factory=_history)
+    user_responses: deque = field(default_factory=_history)
+    question_count: int = 0
+    user_style: str = "neutral"
+    current_question_id: Optional[str] = None
 
 
 class OrderManager:
@@ -22,92 +42,93 @@ class OrderManager:
         self.attribute_schema = REQUIRED_ATTRIBUTES
     
     def get_initial_state(self):
-        return {
-            "active": True,
-            "collected_data": {},
-            "conversation_history": [],
-            "user_responses": [],
-            "question_count": 0,
-            "user_style": "neutral",
-            "current_question_id": None,
-        }
+        return OrderState()
 
-    def process_input(self, user_input, state):
+    def process_input_stream(self, user_input, state, extracted=None):
         """
-        Process user input with hierarchical flow:
+        Process user input with hierarchical flow, yielding the response in
+        chunks:
         1. Extract any mentioned attributes
         2. Run inferences on collected data
         3. Find next applicable question
         4. Generate natural question
+        
+        extracted: attributes already extracted from user_input, if any
+        
+        The state is updated in place; the bot turn is recorded in the
+        conversation history once the response has been fully streamed.
+        """
+        next_q, conv_context, response = self._advance(user_input, state, extracted)
+        if next_q is None:
+            yield response
+            return
+        
+        chunks = []
+        for chunk in generate_next_question_stream(
+            question_info=next_q,
+            collected_data=state.collected_data,
+            conversation_history=conv_context
+        ):
+            chunks.append(chunk)
+            yield chunk
+        
+        state.conversation_history.append(f"Bot: {''.join(chunks)}")
+
+    def _advance(self, user_input, state, extracted=None):
+        """
+        Record the user's answer and move the flow forward. The answer is
+        sent for extraction unless extracted is given.
+        
+        Returns (next_question_info, conversation_context, response). When the
+        flow has ended, next_question_info is None and response holds the
+        closing message; otherwise response is None.
         """
         
         # Add user's response to history
-        state["user_responses"].append(user_input)
-        state["conversation_history"].append(f"User: {user_input}")
+        state.user_responses.append(user_input)
+        state.conversation_history.append(f"User: {user_input}")
         
-        # Build rolling 3-conversation window for context
-        recent_history = state["conversation_history"][-6:]
-        conv_context = "\n".join(recent_history)
+        # History is already the rolling 3-conversation window
+        conv_context = "\n".join(state.conversation_history)
         
         # Get current question context for better extraction
-        current_q_id = state.get("current_question_id")
-        current_q_key = None
-        if current_q_id:
-            for q in QUESTION_FLOW:
-                if q["id"] == current_q_id:
-                    current_q_key = q["key"]
-                    break
+        current_q_key = QUESTION_KEY_BY_ID.get(state.current_question_id)
         
         # Extract attributes from user response
-        extracted = extract_all_mentioned_attributes(
-            user_input=user_input,
-            attribute_schema=self.attribute_schema,
-            conversation_history=conv_context,
-            expected_key=current_q_key
-        )
+        if extracted is None:
+            extracted = extract_all_mentioned_attributes(
+                user_input=user_input,
+                attribute_schema=self.attribute_schema,
+                conversation_history=conv_context,
+                expected_key=current_q_key
+            )
         
         # Update collected data
         for attr_name, attr_value in extracted.items():
             if attr_value is not None:
-                state["collected_data"][attr_name] = attr_value
+                state.collected_data[attr_name] = attr_value
                 print(f"[Captured] {attr_name}: {attr_value}")
         
-        # Run inferences (e.g., has_manual_intake from order_origin_channels)
-        state["collected_data"] = run_inferences(state["collected_data"])
+        # Next applicable unanswered question; this also runs inferences
+        # (e.g., has_manual_intake from order_origin_channels). None means
+        # every required question is answered.
+        next_q = get_next_question_info(state.collected_data)
         
-        # Check if complete
-        if is_complete(state["collected_data"]):
-            self.save_record(state["collected_data"])
-            state["active"] = False
+        if next_q is None:
+            self.save_record(state.collected_data)
+            state.active = False
             
             response = (
                 "This has been incredibly insightful. "
                 "I have captured all the key process details for Order Management. "
                 "Your information has been recorded."
             )
-            state["conversation_history"].append(f"Bot: {response}")
-            return response, state
-        
-        # Get next question
-        next_q = get_next_question_info(state["collected_data"])
+            state.conversation_history.append(f"Bot: {response}")
+            return None, conv_context, response
         
-        if next_q:
-            state["current_question_id"] = next_q["id"]
-            state["question_count"] += 1
-            
-            # Generate natural version of the question
-            question = generate_next_question(
-                question_info=next_q,
-                collected_data=state["collected_data"],
-                conversation_history=conv_context
-            )
-            
-            state["conversation_history"].append(f"Bot: {question}")
-            return question, state
-        else:
-            # Shouldn't reach here, but fallback
-            state["active"] = False
-            return "Thank you, I believe we've covered the key points.", state
+        state.current_question_id = next_q["id"]
+        state.question_count += 1
+        return next_q, conv_context, None
 
     def start_conversation(self):
         """
@@ -116,15 +137,15 @@ class OrderManager:
         state = self.get_initial_state()
         
         # Get first question
-        first_q = get_next_question_info(state["collected_data"])
-        state["current_question_id"] = first_q["id"] if first_q else None
+        first_q = get_next_question_info(state.collected_data)
+        state.current_question_id = first_q["id"] if first_q else None
         
         opening = (
             "Thank you for your time. We're here to map and understand your end-to-end "
             "Order-to-Cash process to identify opportunities for improvement. "
             "Let's start at the very beginning. How does a customer order originate?"
         )
-        state["conversation_history"].append(f"Bot: {opening}")
+        state.conversation_history.append(f"Bot: {opening}")
         
         return opening, state
 
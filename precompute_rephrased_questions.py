@@ -0,0 +1,36 @@
+"""
+Regenerate rephrased_questions.json: asks the LLM once for a natural
+phrasing of every long question in QUESTION_FLOW, so the interview can
+show them without a round-trip. Run after editing the question flow:
+
+    TOGETHER_API_KEY=... python precompute_rephrased_questions.py
+"""
+import json
+
+from attribute_schema import QUESTION_FLOW
+from llm_utils import REPHRASED_QUESTIONS_PATH, call_qwen, _rephrase_messages
+
+
+def main():
+    rephrased = {}
+    for q in QUESTION_FLOW:
+        question = q.get("question")
+        # Same cut-off as generate_next_question_stream
+        if not question or len(question.split()) < 15:
+            continue
+        
+        response = call_qwen(_rephrase_messages(question, q.get("examples", [])), temperature=0.5)
+        if response and len(response) > 10:
+            rephrased[q["id"]] = response.strip()
+            print(f"{q['id']}: {rephrased[q['id']]}")
+        else:
+            print(f"{q['id']}: no usable rephrasing, keeping the original")
+    
+    with open(REPHRASED_QUESTIONS_PATH, "w") as f:
+        json.dump(rephrased, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(rephrased)} questions to {REPHRASED_QUESTIONS_PATH}")
+
+
+if __name__ == "__main__":
+    main()